@@ -21,13 +21,16 @@ class ConfigDB:
                        ({columns_and_types})
                        """)
 
-    def select(self, table_name, conditions=None or {}):
-        select_query = f"SELECT * FROM {table_name}"
+    def select(self, table_name, conditions=None or {}, columns=None, order_by=None):
+        select_query = f"SELECT {', '.join(columns) if columns else '*'} FROM {table_name}"
 
         if conditions:
             select_conditions = ' AND '.join([f"{col} = ?" for col in conditions.keys()])
             select_query += f" WHERE {select_conditions}"
 
+        if order_by:
+            select_query += f" ORDER BY {order_by}"
+
         return self._execute(select_query, tuple(conditions.values()))
 
     def insert(self, table_name, columns):
@@ -40,6 +43,18 @@ class ConfigDB:
                       , tuple(columns.values())
                       )
 
+    def update(self, table_name, columns, conditions):
+        update_columns = ', '.join([f"{col} = ?" for col in columns.keys()])
+        update_conditions = ' AND '.join([f"{col} = ?" for col in conditions.keys()])
+
+        self._execute(f"""
+                       UPDATE {table_name}
+                       SET {update_columns}
+                       WHERE {update_conditions}
+                       """
+                      , tuple(columns.values()) + tuple(conditions.values())
+                      )
+
     def delete(self, table_name, conditions):
         delete_conditions = ' AND '.join([f"{col} = ?" for col in conditions.keys()])
 
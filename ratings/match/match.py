@@ -1,8 +1,73 @@
 import os
 import sys
+import pickle
+import time
+import zlib
 sys.path.append(os.path.dirname(os.path.abspath('../')))
 
 from ratings import ratings
+from database.adapters import ConfigDB
+
+
+class MatchCache:
+
+    """
+    Match results saved in the local match_cache.db under PandasMatcher.cache_key(), so the same worksheet matched
+    against the same candidates with the same configurations loads instead of matching again. Entries are pickled,
+    compressed and evicted least recently used first once they add up to more than max_size bytes.
+    """
+
+    def __init__(self, max_size=256 * 1024 ** 2):
+
+        self.db = ConfigDB('match_cache.db')
+        self.table = 'match_cache'
+        self.max_size = max_size
+
+        self.db.create(self.table, {'cache_key': 'text primary key',
+                                    'results': 'blob not null',
+                                    'size': 'integer not null',
+                                    'last_used': 'real not null'})
+
+    def load(self, cache_key):
+        cursor = self.db.select(self.table, {'cache_key': cache_key}, columns=['results'])
+        row = cursor.fetchone()
+
+        cursor.close()
+
+        if row is None:
+            return None
+
+        self.db.update(self.table, {'last_used': time.time()}, {'cache_key': cache_key})
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def save(self, cache_key, snapshot):
+        results = zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+
+        self.db.delete(self.table, {'cache_key': cache_key})
+        self.db.insert(self.table, {'cache_key': cache_key,
+                                    'results': results,
+                                    'size': len(results),
+                                    'last_used': time.time()})
+        self.evict()
+
+    def evict(self):
+
+        """Deletes the least recently used entries beyond max_size bytes, an entry larger than max_size is not kept"""
+
+        cursor = self.db.select(self.table, columns=['cache_key', 'size'], order_by='last_used DESC')
+        entries = cursor.fetchall()
+        total_size = 0
+
+        cursor.close()
+
+        for cache_key, size in entries:
+            total_size += size
+
+            if total_size > self.max_size:
+                self.db.delete(self.table, {'cache_key': cache_key})
+
+    def reset(self):
+        self.db.reset(self.table)
 
 
 class RatingsMatch:
@@ -12,17 +77,23 @@ class RatingsMatch:
         self.worksheet = ratings.ScorecardWorksheet()
 
         self.pandas_matcher = pandas_matcher
+        # the CLI reruns match() after every configuration or worksheet change, each rerun reuses the retained scores
+        self.pandas_matcher.retain_scores = True
         self.database = database
         self.connection_manager = connection_manager
         self.connection_usage = connection_usage
 
         self.matched_worksheet = None
+        self.match_cache = MatchCache()
         self.__matchable_columns = ['lastname', 'firstname', 'middlename', 'suffix', 'nickname',
                                     'party', 'state', 'office', 'district']
         self.__unused_df = None
 
         self.import_filepath = ''
         self.export_filepath = ''
+        # csv the worksheet is written to row by row while matching, <worksheet>_matched.csv next to the imported
+        # worksheet when empty
+        self.stream_filepath = ''
 
     def import_worksheet(self):
         try:
@@ -47,17 +118,42 @@ class RatingsMatch:
     def recommended_configurations(self):
         self.pandas_matcher.optimize = True
         self.pandas_matcher.auto_optimize = False
+        self.pandas_matcher.normalization = {'casefold': None, 'punctuation': None, 'whitespace': None,
+                                             'suffix': ['lastname', 'suffix'], 'party': ['party']}
         self.pandas_matcher.match_priority_by_column.update(
-            {'middlename': ['fuzzy_partial', 'exact', 'fuzzy_simple', 'token_set'],
+            {'firstname': ['exact', 'alias', 'fuzzy_simple', 'fuzzy_partial', 'token_set'],
+             'nickname': ['exact', 'alias', 'fuzzy_simple', 'fuzzy_partial', 'token_set'],
+             'middlename': ['fuzzy_partial', 'exact', 'fuzzy_simple', 'token_set'],
              'suffix': ['fuzzy_partial', 'token_set', 'fuzzy_simple', 'exact'],
              'party': ['token_set', 'fuzzy_partial', 'exact', 'fuzzy_simple'],
              'office': ['fuzzy_partial', 'exact', 'fuzzy_simple', 'token_set'],
              'district': ['token_set', 'fuzzy_partial', 'exact', 'fuzzy_simple']})
 
+    def _stream_filepath(self):
+        if self.stream_filepath:
+            return self.stream_filepath
+
+        return f"{os.path.splitext(self.import_filepath)[0]}_matched.csv"
+
     def match(self):
         matchable_columns = ['lastname', 'firstname', 'middlename', 'suffix', 'nickname',
                              'party', 'state', 'office', 'district']
-        self.pandas_matcher.match()
+        stream_filepath = self._stream_filepath()
+
+        # results of the same worksheet, candidates and configurations are loaded from an earlier session
+        cache_key = self.pandas_matcher.cache_key()
+        snapshot = self.match_cache.load(cache_key)
+
+        if snapshot is not None:
+            self.pandas_matcher.restore_results(snapshot)
+            self.pandas_matcher.matched_to_file(stream_filepath, ['candidate_id'] + matchable_columns)
+
+            return f"Loaded earlier results, written to:\n'{stream_filepath}'"
+
+        self.pandas_matcher.match_to_file(stream_filepath, ['candidate_id'] + matchable_columns)
+        self.match_cache.save(cache_key, self.pandas_matcher.results_snapshot())
+
+        return f"Rows were written to:\n'{stream_filepath}'\nas they were matched."
 
     def export_matched_worksheet(self):
         try:
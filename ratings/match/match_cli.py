@@ -242,7 +242,8 @@ class MatchRatings(cli.LinkNodeBundle):
         # OBJECTS
         self.__prompt = cli.objects.Prompt("How would you like to configure your match",
                                            command=cli.objects.Command(self.ratings_match.setup))
-        self.__display = cli.objects.Display("Begin Matching...", command=cli.objects.Command(self.ratings_match.match))
+        self.__display = cli.objects.Display("Begin Matching...", command=cli.objects.Command(self.ratings_match.match,
+                                                                                           respond=True))
         self.__table = cli.objects.SimpleTable([['']], as_rows=False, command=cli.objects.Command(self.populate_table))
 
         # NODES
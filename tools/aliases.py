@@ -0,0 +1,38 @@
+import os
+import csv
+import functools
+
+
+NICKNAMES_FILEPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nicknames.csv')
+
+
+# returns {name: frozenset of canonical names}, every name and alias of a row is an equivalent of its canonical name,
+# the table is read and compiled once per filepath
+@functools.lru_cache(maxsize=None)
+def canonical_names(filepath=NICKNAMES_FILEPATH):
+    canonical = {}
+
+    with open(filepath, newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+
+        for row in reader:
+            names = [name.strip().casefold() for name in row if name.strip()]
+
+            for name in names:
+                canonical.setdefault(name, set()).add(names[0])
+
+    return {name: frozenset(canonicals) for name, canonicals in canonical.items()}
+
+
+# returns {name: frozenset of every name sharing a canonical name with it}
+@functools.lru_cache(maxsize=None)
+def equivalent_names(filepath=NICKNAMES_FILEPATH):
+    groups = {}
+
+    for name, canonicals in canonical_names(filepath).items():
+        for canonical in canonicals:
+            groups.setdefault(canonical, set()).add(name)
+
+    return {name: frozenset().union(*[groups[canonical] for canonical in canonicals])
+            for name, canonicals in canonical_names(filepath).items()}
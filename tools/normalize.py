@@ -0,0 +1,62 @@
+import time
+
+
+SUFFIXES = {'junior': 'jr', 'jr': 'jr', 'senior': 'sr', 'sr': 'sr',
+            '2nd': 'ii', 'ii': 'ii', '3rd': 'iii', 'iii': 'iii', '4th': 'iv', 'iv': 'iv'}
+
+PARTIES = {'democratic': 'd', 'democrat': 'd', 'dem': 'd', 'd': 'd',
+           'republican': 'r', 'rep': 'r', 'gop': 'r', 'r': 'r',
+           'independent': 'i', 'ind': 'i', 'i': 'i',
+           'libertarian': 'l', 'lib': 'l', 'l': 'l',
+           'green': 'g', 'grn': 'g', 'g': 'g'}
+
+
+# returns a pandas.Series with every cell case folded
+def casefold(series):
+    return series.str.casefold()
+
+
+# returns a pandas.Series with periods and apostrophes dropped and any other punctuation turned into spaces
+def punctuation(series):
+    return series.str.replace(r"[.'`]", '', regex=True).str.replace(r'[^\w\s]', ' ', regex=True)
+
+
+# returns a pandas.Series with runs of whitespace collapsed into single spaces and trimmed
+def whitespace(series):
+    return series.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+# returns a pandas.Series with generational suffixes (Junior, Jr, 3rd, III...) written one canonical way
+def suffix(series):
+    pattern = r'(?i)\b(' + '|'.join(SUFFIXES.keys()) + r')\b\.?'
+    return series.str.replace(pattern, lambda m: SUFFIXES[m.group(1).lower()], regex=True)
+
+
+# returns a pandas.Series with party names (Democratic, GOP, Ind...) replaced by their one letter abbreviation
+def party(series):
+    abbreviations = series.str.strip().str.casefold().map(PARTIES)
+    return series.where(abbreviations.isna(), abbreviations)
+
+
+STEPS = {'casefold': casefold,
+         'punctuation': punctuation,
+         'whitespace': whitespace,
+         'suffix': suffix,
+         'party': party}
+
+
+# returns a normalized copy of df and the seconds spent in each step, steps are {step: [column_1...] or None for all}
+def normalize(df, steps):
+    df = df.copy()
+    times = {}
+
+    for step, columns in steps.items():
+        start = time.perf_counter()
+
+        for column in columns if columns is not None else df.columns:
+            if column in df.columns:
+                df[column] = STEPS[step](df[column])
+
+        times[step] = time.perf_counter() - start
+
+    return df, times
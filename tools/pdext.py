@@ -1,7 +1,434 @@
+import csv
+import hashlib
+import itertools
+import math
+import numpy
 import pandas
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 from fuzzywuzzy import fuzz
-from tools import pdext
+from tools import aliases
+from tools import analysis
+from tools import normalize
+from tools import retrieval
+
+try:
+    from rapidfuzz import fuzz as rapid_fuzz
+    from rapidfuzz import process as rapid_process
+    from rapidfuzz import utils as rapid_utils
+except ImportError:
+    rapid_fuzz = rapid_process = rapid_utils = None
+
+
+# matcher copy installed once per pool process by _init_worker
+_worker_matcher = None
+
+
+def _init_worker(pandas_matcher):
+    global _worker_matcher
+    _worker_matcher = pandas_matcher
+
+
+def _match_shard(indices_to):
+    return _worker_matcher._match_rows(indices_to)
+
+
+class TopMatches:
+
+    """
+    Running tracker of the best scoring candidates of one match_to row. Only the candidates tied at the best score seen
+    so far keep their row_score and row_algo, everything else is discarded as soon as it falls behind.
+    """
+
+    def __init__(self, threshold, columns):
+
+        self.threshold = threshold
+        self.columns = columns
+        self.best_score = None
+
+        # [(rows, row_score[rows, columns], row_algo[rows, columns]), ...], one entry per chunk with a winner
+        self.winners = []
+
+    def update(self, candidates, row_score, row_algo, row_score_sum):
+        passable = row_score_sum >= self.threshold
+
+        if not passable.any():
+            return
+
+        best_score = float(row_score_sum[passable].max())
+
+        if self.best_score is not None and best_score < self.best_score:
+            return
+
+        if self.best_score is None or best_score > self.best_score:
+            self.best_score = best_score
+            self.winners = []
+
+        tied = numpy.flatnonzero(row_score_sum == best_score)
+        self.winners.append((candidates[tied],
+                             numpy.column_stack([row_score[column][tied] for column in self.columns]),
+                             numpy.column_stack([row_algo[column][tied] for column in self.columns])))
+
+    def results(self, total_threshold):
+
+        """Returns (index_from, row_score_sum, row_score, row_algo, status) arrays, the layout MatchResults stores"""
+
+        if not self.winners:
+            return MatchResults.no_matches(len(self.columns))
+
+        index_from = numpy.concatenate([rows for rows, _, _ in self.winners]).astype(numpy.int64)
+        status = MatchResults.statuses.index('MATCHED' if self.best_score >= total_threshold else 'REVIEW')
+
+        return (index_from,
+                numpy.full(len(index_from), self.best_score),
+                numpy.concatenate([row_score for _, row_score, _ in self.winners]),
+                numpy.concatenate([row_algo for _, _, row_algo in self.winners]).astype(numpy.int8),
+                numpy.full(len(index_from), status, dtype=numpy.int8))
+
+
+class MatchResults(Mapping):
+
+    """
+    Top matches of every match_to row, stored as flat arrays with one entry per (unique match_to row, candidate) pair.
+    Duplicate match_to rows point at the same entries through starts and ends. Reading a row still returns the
+    {index_from: {'row_score_sum', 'row_score', 'row_algo', 'match_status'}} dict match() used to keep.
+    """
+
+    statuses = ['MATCHED', 'REVIEW']
+
+    def __init__(self, columns, algo_names, starts, ends, index_from, row_score_sum, row_score, row_algo, status):
+
+        # [column_1, column_2...], order of the second axis of row_score and row_algo
+        self.columns = columns
+        # array([algo_name_1, algo_name_2...]), row_algo holds positions in it
+        self.algo_names = algo_names
+
+        # array([start_1, start_2...]), array([end_1, end_2...]), entries of each match_to row
+        self.starts = starts
+        self.ends = ends
+
+        self.index_from = index_from
+        self.row_score_sum = row_score_sum
+        self.row_score = row_score
+        self.row_algo = row_algo
+        self.status = status
+
+    @staticmethod
+    def no_matches(column_count):
+        return (numpy.array([], dtype=numpy.int64), numpy.array([]), numpy.zeros((0, column_count)),
+                numpy.zeros((0, column_count), dtype=numpy.int8), numpy.array([], dtype=numpy.int8))
+
+    @classmethod
+    def from_top_matches(cls, columns, algo_names, top_matches, row_codes):
+
+        """Packs the results() of each unique match_to row, row_codes maps every match_to row to its unique row"""
+
+        counts = numpy.array([len(index_from) for index_from, *_ in top_matches], dtype=numpy.int64)
+        ends = numpy.cumsum(counts)
+        fields = zip(cls.no_matches(len(columns)), *top_matches)
+
+        return cls(columns, algo_names, (ends - counts)[row_codes], ends[row_codes],
+                   *(numpy.concatenate(field) for field in fields))
+
+    @classmethod
+    def as_top_matches(cls, columns, algo_names, index_from, row_score_sum, row_score, row_algo, status):
+
+        """Returns the {index_from: {...}} dict of one match_to row from its results() arrays"""
+
+        top_matches = {}
+
+        for i in range(0, len(index_from)):
+            top_matches[int(index_from[i])] = {'row_score_sum': float(row_score_sum[i]),
+                                               'row_score': dict(zip(columns, row_score[i].tolist())),
+                                               'row_algo': dict(zip(columns, algo_names[row_algo[i]])),
+                                               'match_status': cls.statuses[status[i]]}
+
+        return top_matches
+
+    def __getitem__(self, index_to):
+        if not 0 <= index_to < len(self.starts):
+            raise KeyError(index_to)
+
+        entries = slice(self.starts[index_to], self.ends[index_to])
+
+        return self.as_top_matches(self.columns, self.algo_names, self.index_from[entries],
+                                   self.row_score_sum[entries], self.row_score[entries], self.row_algo[entries],
+                                   self.status[entries])
+
+    def __iter__(self):
+        return iter(range(0, len(self.starts)))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def counts(self):
+        return self.ends - self.starts
+
+    def entries(self):
+
+        """Returns (index_to, entry) arrays listing the entries of every match_to row, duplicates included"""
+
+        counts = self.counts()
+        index_to = numpy.repeat(numpy.arange(len(counts)), counts)
+        entry = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts - self.starts, counts)
+
+        return index_to, entry
+
+    def to_frame(self):
+
+        """Returns the long format pandas.DataFrame, one row per (match_to row, candidate) with categorical algos"""
+
+        index_to, entry = self.entries()
+        frame = pandas.DataFrame({'index_to': index_to,
+                                  'index_from': self.index_from[entry],
+                                  'row_score_sum': self.row_score_sum[entry],
+                                  'match_status': pandas.Categorical.from_codes(self.status[entry], self.statuses)})
+
+        for i, column in enumerate(self.columns):
+            frame[f'{column}_score'] = self.row_score[entry, i]
+            frame[f'{column}_algo'] = pandas.Categorical.from_codes(self.row_algo[entry, i], self.algo_names)
+
+        return frame
+
+    def algo_breakdown(self):
+        frame = self.to_frame()
+        return pandas.DataFrame({column: frame[f'{column}_algo'].value_counts(sort=False) for column in self.columns})
+
+    def score_breakdown(self):
+        frame = self.to_frame()
+        groups = frame.groupby('match_status', observed=False)
+
+        breakdown = groups[['row_score_sum', *[f'{column}_score' for column in self.columns]]].mean()
+        breakdown.insert(0, 'matches', groups.size())
+
+        return breakdown
+
+
+class ScoreCache:
+
+    """Bounded least recently used cache of (algo_name, score) keyed by (column, cell_to, cell_from)"""
+
+    def __init__(self, maxsize):
+
+        self.maxsize = maxsize
+        self.__entries = OrderedDict()
+
+    def get(self, key):
+        cell_score = self.__entries.get(key)
+
+        if cell_score is not None:
+            self.__entries.move_to_end(key)
+
+        return cell_score
+
+    def put(self, key, cell_score):
+        self.__entries[key] = cell_score
+
+        if len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+class RetainedScores:
+
+    """
+    Raw, unthresholded scores of one match_to row against its candidates, in whole percent, per (column, algo_name).
+    A bitmap marks the pairs the cascade scored, and only the scores above the lowest threshold seen so far, the floor,
+    are kept as sorted positions in candidates with their int8 scores. Scores at or under the floor fail every
+    threshold from the floor up, so they are read back as 0.
+    """
+
+    def __init__(self, candidates):
+
+        self.candidates = candidates
+        # {(column, algo_name): floor}, {(column, algo_name): packed bits}, {(column, algo_name): (positions, raw)}
+        self.__floors = {}
+        self.__scored = {}
+        self.__scores = {}
+
+    def get(self, column, algo_name, positions, threshold):
+
+        """
+        Returns the raw scores of the candidates at positions, -1 for the pairs never scored. A threshold under the
+        floor makes the scores dropped at the floor unknown again, so only the pairs with a kept score stay scored.
+        """
+
+        key = (column, algo_name)
+
+        if key not in self.__floors or threshold < self.__floors[key]:
+            self.__floors[key] = threshold
+            self.__scored[key] = numpy.zeros((len(self.candidates) + 7) // 8, dtype=numpy.uint8)
+
+            if key in self.__scores:
+                self._mark(key, self.__scores[key][0])
+
+        scored = (self.__scored[key][positions >> 3] >> (7 - (positions & 7))) & 1
+        raw = numpy.where(scored == 1, 0, -1).astype(numpy.int8)
+
+        if key in self.__scores:
+            stored_positions, stored_raw = self.__scores[key]
+            found = numpy.searchsorted(stored_positions, positions)
+            hit = found < len(stored_positions)
+            hit[hit] = stored_positions[found[hit]] == positions[hit]
+            raw[hit] = stored_raw[found[hit]]
+
+        return raw
+
+    def floor(self, column, algo_name):
+        return self.__floors[(column, algo_name)]
+
+    def put(self, column, algo_name, positions, raw):
+
+        """Marks the candidates at positions as scored and keeps their raw scores above the floor get() has set"""
+
+        key = (column, algo_name)
+        self._mark(key, positions)
+
+        kept = numpy.asarray(raw) > self.__floors[key] * 100
+        positions = numpy.asarray(positions, dtype=numpy.int32)[kept]
+        raw = numpy.asarray(raw, dtype=numpy.int8)[kept]
+
+        if not len(positions):
+            return
+
+        if key in self.__scores:
+            stored_positions, stored_raw = self.__scores[key]
+            positions = numpy.concatenate([stored_positions, positions])
+            raw = numpy.concatenate([stored_raw, raw])
+
+        order = numpy.argsort(positions, kind='stable')
+        self.__scores[key] = (positions[order], raw[order])
+
+    def _mark(self, key, positions):
+        positions = numpy.asarray(positions, dtype=numpy.int64)
+        numpy.bitwise_or.at(self.__scored[key], positions >> 3, (1 << (7 - (positions & 7))).astype(numpy.uint8))
+
+    def _remap(self, candidates, new_positions):
+
+        """Returns the scores against candidates, every position p moved to new_positions[p] and dropped at -1"""
+
+        remapped = RetainedScores(candidates)
+
+        for key, floor in self.__floors.items():
+            scored = numpy.flatnonzero(numpy.unpackbits(self.__scored[key], count=len(self.candidates)))
+            moved = new_positions[scored]
+
+            remapped.__floors[key] = floor
+            remapped.__scored[key] = numpy.zeros((len(candidates) + 7) // 8, dtype=numpy.uint8)
+            remapped._mark(key, moved[moved >= 0])
+
+            if key in self.__scores:
+                positions, raw = self.__scores[key]
+                moved = new_positions[positions]
+                kept = numpy.flatnonzero(moved >= 0)
+                order = kept[numpy.argsort(moved[kept], kind='stable')]
+
+                if len(order):
+                    remapped.__scores[key] = (moved[order].astype(numpy.int32), raw[order])
+
+        return remapped
+
+    def relocate(self, moved):
+
+        """
+        Returns the scores with every candidate row r moved to moved[r], rows moved to -1 are dropped along with their
+        scores. Used when match_from is replaced, moved maps the old match_from positions to the new ones.
+        """
+
+        new_candidates = moved[self.candidates]
+        kept = numpy.flatnonzero(new_candidates >= 0)
+        kept = kept[numpy.argsort(new_candidates[kept], kind='stable')]
+
+        new_positions = numpy.full(len(self.candidates), -1, dtype=numpy.int64)
+        new_positions[kept] = numpy.arange(len(kept))
+
+        return self._remap(new_candidates[kept], new_positions)
+
+    def realign(self, candidates):
+
+        """Returns the scores against a new candidate set, keeping those of the rows found in both"""
+
+        if numpy.array_equal(candidates, self.candidates):
+            return self
+
+        _, positions, new_positions = numpy.intersect1d(self.candidates, candidates, assume_unique=True,
+                                                        return_indices=True)
+
+        moved = numpy.full(len(self.candidates), -1, dtype=numpy.int64)
+        moved[positions] = new_positions
+
+        return self._remap(candidates, moved)
+
+
+class MatchWriter:
+
+    """
+    Appends worksheet rows to a csv file as their top_matches come in, laid out like matched_df after
+    apply_to_columns(columns). Rows are written in worksheet order, a row done ahead of an earlier one (a repeated row,
+    or one from a faster worker) is held until the rows before it are written. Every row is flushed once written, and
+    the rows still held are written on close, so a file cut short by a crash keeps the rows done.
+    """
+
+    def __init__(self, filepath, match_to, match_from, columns):
+
+        self.filepath = filepath
+        self.columns = [column for column in columns if column in match_from.columns]
+
+        self.__index_to = match_to.index.tolist()
+        self.__cells_to = match_to.to_numpy(dtype=object)
+        self.__cells_from = match_from[self.columns].to_numpy(dtype=object)
+
+        self.__header = [*match_to.columns, *[column for column in self.columns if column not in match_to.columns],
+                         'matched_row', 'match_score', 'match_status']
+
+        self.__file = open(filepath, 'w', newline='')
+        self.__writer = csv.writer(self.__file)
+        self.__writer.writerow(['', *self.__header])
+
+        # {index_to: csv row}, rows done before index_to reaches __next_index_to
+        self.__held = {}
+        self.__next_index_to = 0
+
+    def write(self, index_to, top_matches):
+        row = dict(zip(self.__header, self.__cells_to[index_to]))
+
+        if len(top_matches) == 1:
+            (i, top_match), = top_matches.items()
+
+            row.update(zip(self.columns, self.__cells_from[i]))
+            row.update({'matched_row': i + 2,
+                        'match_score': top_match['row_score_sum'],
+                        'match_status': top_match['match_status']})
+
+        elif len(top_matches) >= 1:
+            row.update({'matched_row': ', '.join(map(str, top_matches.keys())), 'match_status': 'AMBIGUOUS MATCH'})
+
+        else:
+            row.update({'match_status': 'UNMATCHED'})
+
+        self.__held[index_to] = [self.__index_to[index_to], *[row.get(column, '') for column in self.__header]]
+
+        while self.__next_index_to in self.__held:
+            self.__writer.writerow(self.__held.pop(self.__next_index_to))
+            self.__next_index_to += 1
+
+        self.__file.flush()
+
+    def close(self):
+        for index_to in sorted(self.__held):
+            self.__writer.writerow(self.__held.pop(index_to))
+
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 
 class PandasMatcher:
@@ -14,10 +441,38 @@ class PandasMatcher:
         self.match_from = pandas.DataFrame()
 
         self.__algo = {'exact': self._exact,
+                       'alias': self._alias,
                        'fuzzy_simple': self._fuzzy_simple,
                        'fuzzy_partial': self._fuzzy_partial,
                        'token_set': self._token_set}
 
+        self.__algo_batch = {'exact': self._exact_batch,
+                             'alias': self._alias_batch,
+                             'fuzzy_simple': self._fuzzy_simple_batch,
+                             'fuzzy_partial': self._fuzzy_partial_batch,
+                             'token_set': self._token_set_batch}
+
+        # array(['unmatched', algo_name_1...]), row_algo arrays hold positions in it rather than names
+        self.__algo_names = numpy.array(['unmatched', *self.__algo], dtype=object)
+        self.__algo_codes = {algo_name: code for code, algo_name in enumerate(self.__algo_names)}
+
+        # {algo_name: (scorer, processor)}, fuzzywuzzy's scorers define what every threshold means
+        self.__scorers = {'fuzzy_simple': (fuzz.ratio, None),
+                          'fuzzy_partial': (fuzz.partial_ratio, None),
+                          'token_set': (fuzz.token_set_ratio, None)}
+
+        # {algo_name: (scorer, processor)}, rapidfuzz's C scorers when installed. Its ratio is the same Indel ratio
+        # fuzzywuzzy computes through python-Levenshtein, but partial_ratio is a different alignment and token_set
+        # keeps non ascii characters, so those two are only used when fast_scorers is turned on
+        self.__rapid_scorers = {}
+
+        if rapid_fuzz:
+            self.__rapid_scorers = {'fuzzy_partial': (rapid_fuzz.partial_ratio, None),
+                                    'token_set': (rapid_fuzz.token_set_ratio, rapid_utils.default_process)}
+
+            if fuzz.SequenceMatcher.__module__ != 'difflib':
+                self.__rapid_scorers['fuzzy_simple'] = (rapid_fuzz.ratio, None)
+
         # CONFIGURATIONS
         self.optimize = True
         self.auto_optimize = False
@@ -29,39 +484,255 @@ class PandasMatcher:
         self.match_priority_default = ['exact', 'fuzzy_simple', 'fuzzy_partial', 'token_set']
         self.columns_to_match = {}
 
+        # {step_1: [column_1, column_2...] or None for every column, step_2: ...}, run in order by setup() on copies of
+        # match_to and match_from used for scoring, steps are 'casefold', 'punctuation', 'whitespace', 'suffix', 'party'
+        self.normalization = {}
+        # scores fuzzy_partial and token_set with rapidfuzz too, much faster but their scores differ from fuzzywuzzy's
+        # (e.g. 'State Senate' and 'U.S. Senate' partial_ratio is 64 in fuzzywuzzy, 78 in rapidfuzz). Only rapidfuzz
+        # abandons a pair early once it can't reach the threshold, fuzzywuzzy always computes the full score
+        self.fast_scorers = False
+        # threads used by rapidfuzz's cdist for each batch, -1 uses every core
+        self.scorer_workers = 1
+        # processes match() shards match_to rows across, 1 matches in the current process
+        self.workers = 1
+        # match_from rows scored together per batch, bounds memory per worksheet row
+        self.chunk_size = 4096
+        # columns with at most this many distinct match_from values have their cell scores cached
+        self.cache_cardinality_limit = 50
+        self.cache_size = 65536
+
+        # {column_1: key_length_1, column_2: key_length_2...}, a key_length of 0 blocks on the whole cell
+        # e.g. {'state': 0, 'office': 0, 'lastname': 1}, columns are dropped from the end for wider blocks
+        self.blocking_columns = {}
+
+        # [column_1, column_2...], worksheet rows with exactly one candidate sharing these (normalized) cells are
+        # resolved as MATCHED before the fuzzy pass, e.g. ['lastname', 'firstname', 'state']
+        self.exact_join_columns = []
+
+        # [column_1, column_2...], name columns whose character n-gram index narrows each block to the candidates that
+        # can still pass fuzzy_threshold on at least one of them, e.g. ['lastname', 'firstname']
+        self.ngram_columns = []
+        self.ngram_size = 3
+
+        # {column_1: encoding_1...}, 'soundex' or 'metaphone' (Double Metaphone), rows sounding like the worksheet cell
+        # are retrieved as candidates as well, e.g. {'lastname': 'soundex'}
+        self.phonetic_columns = {}
+
+        # {column_1: window_1...}, once the column is sorted by its normalized value, the block narrows to the rows
+        # sharing the worksheet cell's value and window rows on either side of them, e.g. {'lastname': 10}
+        self.sorted_neighborhood_columns = {}
+
+        # 'default' scores blocks narrowed by the indexes above, 'tfidf' scores the tfidf_top_k most similar rows by
+        # TF-IDF character n-grams of the tfidf_columns joined together
+        self.engine = 'default'
+        self.tfidf_columns = ['lastname', 'firstname', 'office']
+        self.tfidf_top_k = 20
+        self.tfidf_chunk_size = 256
+
         # {column_1: [customized_priority], column_2: [default_priority]...}
         self.match_priority_by_column = {}
 
+        # match_from column identifying a candidate across query runs, when match_from is replaced the candidates whose
+        # row is unchanged keep their retained scores, only added or changed candidates are scored
+        self.candidate_id_column = 'candidate_id'
+
+        # keeps the raw score of every pair the cascade reaches, so re-running match() after a threshold, priority,
+        # worksheet or candidate change only re-applies the cascade. Costs a bit per scored pair, algo and column plus
+        # five bytes per score above the threshold, it is off for one-off matches and turned on by sweep() and the CLI
+        self.retain_scores = False
+
         self.__uniqueness_to = {}
         self.__uniqueness_from = {}
 
+        # normalized copies of match_to and match_from, everything is scored and indexed on these
+        self.__normalized_to = pandas.DataFrame()
+        self.__normalized_from = pandas.DataFrame()
+        # {step_1: seconds_1, step_2: seconds_2...}, summed over both frames
+        self.__normalization_times = {}
+
+        # [(column_1, uniqueness_1, remaining_1), (column_2, uniqueness_2, remaining_2)...], heaviest column first,
+        # remaining is the sum of the uniqueness of every column scored after it
+        self.__weights = []
+        # {column_1: [cell_1, cell_2...], column_2: [...]}, plain lists so match() never touches .iloc
+        self.__columns_to = {}
+        # {column_1: array([cell_1, cell_2...]), column_2: ...}, object arrays sliced by candidate rows
+        self.__columns_from = {}
+        # {column_1: array([length_1, length_2...]), column_2: ...}, bounds the fuzz.ratio a candidate can reach
+        self.__lengths_from = {}
+        # [(key_1, key_2...), ...], one full depth blocking key per match_to row
+        self.__blocking_keys_to = []
+
+        # [{(key_1, key_2...): [row_1, row_2...]}, {(key_1,): [...]}...], narrowest block first
+        self.__blocks = []
+
+        # {(key_1, key_2...): [row_1, row_2...]}, match_from rows by their exact_join_columns
+        self.__join_index = {}
+        # [(key_1, key_2...), ...], one join key per match_to row
+        self.__join_keys_to = []
+
+        # {column_1: retrieval.NGramIndex, column_2: ...}
+        self.__ngram_indexes = {}
+        # {column_1: [cell_1, cell_2...], column_2: ...}, match_to cells queried against the retrieval indexes
+        self.__retrieval_cells_to = {}
+
+        # {column_1: retrieval.PhoneticIndex, column_2: ...}
+        self.__phonetic_indexes = {}
+        # {column_1: [(code_1, code_2...), ...], column_2: ...}, phonetic codes of each match_to row
+        self.__phonetic_codes_to = {}
+
+        # {column_1: retrieval.SortedNeighborhood, column_2: ...}
+        self.__neighborhoods = {}
+        # {column_1: [key_1, key_2...], column_2: ...}, normalized sort key of each match_to row
+        self.__neighborhood_keys_to = {}
+
+        # [array([row_1, row_2...]), ...], candidates of each match_to row under the tfidf engine
+        self.__tfidf_candidates = []
+
+        # array([fingerprint_1, fingerprint_2...]), 64 bit hash of the cells of each match_to row, see _row_keys()
+        self.__fingerprints_to = numpy.array([], dtype=numpy.uint64)
+        # array([code_1, code_2...]), one code per match_to row, rows repeating every matched cell share a code
+        self.__row_codes_to = numpy.array([], dtype=int)
+        # array([row_1, row_2...]), first match_to row of each code, the only rows match() actually scores
+        self.__unique_to = numpy.array([], dtype=int)
+
+        # {column_1: array([code_1, code_2...]), column_2: ...}, dictionary encoding of the columns that have at most
+        # cache_cardinality_limit distinct values in both match_to and match_from
+        self.__codes_to = {}
+        self.__codes_from = {}
+        # {column_1: (array([distinct_to_1...]), array([distinct_from_1...])), column_2: ...}
+        self.__categories = {}
+        # {column_1: (algo_codes[distinct_to, distinct_from], scores[distinct_to, distinct_from]), column_2: ...}
+        self.__score_tables = {}
+
+        # columns scored through __score_cache, chosen in setup() by cache_cardinality_limit
+        self.__cached_columns = set()
+        self.__score_cache = ScoreCache(self.cache_size)
+        # {fingerprint_1: RetainedScores, fingerprint_2: ...}, by match_to row fingerprint, for columns scored outside
+        # tables and the cache. Kept across setup() for the rows still in match_to while match_from keeps its version
+        self.__retained_scores = {}
+        # content hash of the normalized match_from the retained scores were computed against
+        self.__from_version = None
+        # candidate ids and row hashes of that match_from, diffed against the next one by setup()
+        self.__ids_from = numpy.array([], dtype=object)
+        self.__hashes_from = numpy.array([], dtype=numpy.uint64)
+        # {'added': count, 'removed': count}, candidates added (or changed) and removed by the last setup()
+        self.__from_changes = {'added': 0, 'removed': 0}
+
         # RESULTS
-        self.__matched = {}
+        # MatchResults, reads as {index_to: {index_from: {'row_score_sum'...}}} for every match_to row
+        self.__matched = MatchResults.from_top_matches([], self.__algo_names, [], numpy.array([], dtype=int))
         self.__matched_df = pandas.DataFrame()
         self.__total_count = 0
         self.__total_matched_count = 0
         self.__pass_matched_count = 0
         self.__review_matched_count = 0
+        # {counter_1: count_1...}, per match() run, summed across pool workers
+        self.__counters = {'fallback_blocks': 0, 'pruned_cells': 0, 'cache_hits': 0, 'cache_misses': 0,
+                           'exact_join_rows': 0, 'fuzzy_rows': 0, 'retrieved_rows': 0, 'retrieved_candidates': 0,
+                           'retrieval_avoided': 0, 'neighborhood_avoided': 0, 'length_pruned': 0, 'duplicate_rows': 0,
+                           'retained_hits': 0, 'retained_rows': 0}
 
     @staticmethod
     def _exact(cell_to, cell_from):
         return 1.0 if cell_to == cell_from else 0.0
 
+    @staticmethod
+    def _alias(cell_to, cell_from):
+        return 1.0 if cell_from.strip().casefold() in aliases.equivalent_names().get(cell_to.strip().casefold(), ()) \
+            else 0.0
+
     def _fuzzy_simple(self, cell_to, cell_from):
-        score = float(fuzz.ratio(cell_to, cell_from)) / 100
+        score = self._raw_score('fuzzy_simple', cell_to, cell_from, self.fuzzy_threshold)
         return score if score > self.fuzzy_threshold else 0.0
 
     def _fuzzy_partial(self, cell_to, cell_from):
-        score = float(fuzz.partial_ratio(cell_to, cell_from)) / 100
+        score = self._raw_score('fuzzy_partial', cell_to, cell_from, self.partial_fuzzy_threshold)
         return score if score > self.partial_fuzzy_threshold else 0.0
 
     def _token_set(self, cell_to, cell_from):
-        score = float(fuzz.token_set_ratio(cell_to, cell_from)) / 100
+        score = self._raw_score('token_set', cell_to, cell_from, self.token_set_threshold)
         return score if score > self.token_set_threshold else 0.0
 
+    @staticmethod
+    def _exact_batch(cell_to, cells_from):
+        return (cells_from == cell_to).astype(float)
+
+    @staticmethod
+    def _alias_batch(cell_to, cells_from):
+        equivalents = aliases.equivalent_names().get(cell_to.strip().casefold())
+
+        if not equivalents:
+            return numpy.zeros(len(cells_from))
+
+        return numpy.isin(numpy.char.strip(numpy.char.lower(cells_from.astype(str))), list(equivalents)).astype(float)
+
+    def _fuzzy_simple_batch(self, cell_to, cells_from):
+        scores = self._raw_scores('fuzzy_simple', cell_to, cells_from, self.fuzzy_threshold)
+        return numpy.where(scores > self.fuzzy_threshold, scores, 0.0)
+
+    def _fuzzy_partial_batch(self, cell_to, cells_from):
+        scores = self._raw_scores('fuzzy_partial', cell_to, cells_from, self.partial_fuzzy_threshold)
+        return numpy.where(scores > self.partial_fuzzy_threshold, scores, 0.0)
+
+    def _token_set_batch(self, cell_to, cells_from):
+        scores = self._raw_scores('token_set', cell_to, cells_from, self.token_set_threshold)
+        return numpy.where(scores > self.token_set_threshold, scores, 0.0)
+
+    @staticmethod
+    def _score_cutoff(threshold):
+
+        """
+        Lowest raw score, in percent, that can still round above threshold. rapidfuzz abandons the computation of a pair
+        as soon as it is provably below the cutoff and reports 0 for it, which is what thresholding would have done.
+        """
+
+        return max(0.0, threshold * 100 - 0.5) if threshold is not None else None
+
+    def _scorer(self, algo_name):
+
+        """Returns (scorer, processor, is_rapid), rapidfuzz only where it scores as fuzzywuzzy or with fast_scorers"""
+
+        if algo_name in self.__rapid_scorers and (algo_name == 'fuzzy_simple' or self.fast_scorers):
+            return (*self.__rapid_scorers[algo_name], True)
+
+        return (*self.__scorers[algo_name], False)
+
+    def _raw_score(self, algo_name, cell_to, cell_from, threshold=None):
+        scorer, processor, is_rapid = self._scorer(algo_name)
+
+        if processor:
+            cell_to, cell_from = processor(cell_to), processor(cell_from)
+
+        score = scorer(cell_to, cell_from, score_cutoff=self._score_cutoff(threshold)) if is_rapid else \
+            scorer(cell_to, cell_from)
+
+        # scores are rounded to whole percentages, as fuzzywuzzy reports them, so thresholds mean the same
+        return float(round(score)) / 100
+
+    def _raw_scores(self, algo_name, cell_to, cells_from, threshold=None):
+        scorer, processor, is_rapid = self._scorer(algo_name)
+
+        if is_rapid:
+            scores = rapid_process.cdist([cell_to], cells_from, scorer=scorer, processor=processor,
+                                         score_cutoff=self._score_cutoff(threshold), workers=self.scorer_workers)[0]
+        else:
+            scores = numpy.fromiter((scorer(cell_to, cell_from) for cell_from in cells_from),
+                                    dtype=float, count=len(cells_from))
+
+        return numpy.rint(scores).astype(float) / 100
+
+    def _algo_threshold(self, algo_name):
+        return {'fuzzy_simple': self.fuzzy_threshold,
+                'fuzzy_partial': self.partial_fuzzy_threshold,
+                'token_set': self.token_set_threshold}.get(algo_name, 0.0)
+
+    def _priority(self, column):
+        return self.match_priority_by_column[column] if column in self.match_priority_by_column.keys() \
+                                                     else self.match_priority_default
+
     def _cell_score(self, cell_to, cell_from, columns):
-        priority = self.match_priority_by_column[columns] if columns in self.match_priority_by_column.keys() \
-                                                          else self.match_priority_default
+        priority = self._priority(columns)
+
         for algo_name in priority:
             cell_score = self.__algo[algo_name](cell_to, cell_from)
 
@@ -70,27 +741,407 @@ class PandasMatcher:
 
         return 'unmatched', float(0)
 
-    def _row_score(self, row_to, row_from):
-        row_score = {}
-        row_algo = {}
+    def _length_feasible(self, length_to, lengths_from):
+
+        """fuzz.ratio is at most 2 * min(len_a, len_b) / (len_a + len_b), rounding allows another half percent"""
 
-        for column, u in self.__uniqueness_to.items():
-            algo_name, score = self._cell_score(row_to[column], row_from[column], column)
-            row_score[column] = score * u
-            row_algo[column] = algo_name
+        total = length_to + lengths_from
+        return (total == 0) | (2 * numpy.minimum(length_to, lengths_from) >= (self.fuzzy_threshold - 0.005) * total)
 
-        return row_score, row_algo
+    def _column_score(self, cell_to, cells_from, column, lengths_from=None):
+
+        """
+        Runs the _cell_score cascade for one cell against a whole column, returning (algo_codes, scores) arrays. Given
+        the candidates' lengths, fuzzy_simple skips every candidate outside the feasible length window.
+        """
+
+        algo_codes = numpy.zeros(len(cells_from), dtype=numpy.int8)
+        scores = numpy.zeros(len(cells_from))
+        pending = numpy.arange(len(cells_from))
+
+        for algo_name in self._priority(column):
+            if not len(pending):
+                break
+
+            if algo_name == 'fuzzy_simple' and lengths_from is not None:
+                feasible = self._length_feasible(len(cell_to), lengths_from[pending])
+                self.__counters['length_pruned'] += int((~feasible).sum())
+
+                cell_scores = numpy.zeros(len(pending))
+                cell_scores[feasible] = self.__algo_batch[algo_name](cell_to, cells_from[pending[feasible]])
+            else:
+                cell_scores = self.__algo_batch[algo_name](cell_to, cells_from[pending])
+
+            passed = cell_scores > 0
+
+            algo_codes[pending[passed]] = self.__algo_codes[algo_name]
+            scores[pending[passed]] = cell_scores[passed]
+            pending = pending[~passed]
+
+        return algo_codes, scores
+
+    def _retained_column_score(self, cell_to, cells_from, column, lengths_from, retained, positions):
+
+        """
+        Same as _column_score, but raw scores are read from retained at positions and only the pairs never scored
+        before are sent to the scorers, their raw scores are kept for the next run
+        """
+
+        algo_codes = numpy.zeros(len(cells_from), dtype=numpy.int8)
+        scores = numpy.zeros(len(cells_from))
+        pending = numpy.arange(len(cells_from))
+
+        for algo_name in self._priority(column):
+            if not len(pending):
+                break
+
+            # exact and alias take no threshold, scoring them again costs no more than looking them up
+            if algo_name not in self.__scorers:
+                cell_scores = self.__algo_batch[algo_name](cell_to, cells_from[pending])
+                passed = cell_scores > 0
+
+                algo_codes[pending[passed]] = self.__algo_codes[algo_name]
+                scores[pending[passed]] = cell_scores[passed]
+                pending = pending[~passed]
+                continue
+
+            threshold = self._algo_threshold(algo_name)
+            raw = retained.get(column, algo_name, positions[pending], threshold)
+            unscored = numpy.flatnonzero(raw < 0)
+            self.__counters['retained_hits'] += len(pending) - len(unscored)
+
+            if algo_name == 'fuzzy_simple':
+                feasible = self._length_feasible(len(cell_to), lengths_from[pending[unscored]])
+                self.__counters['length_pruned'] += int((~feasible).sum())
+                unscored = unscored[feasible]
+
+            if len(unscored):
+                # cut off at the floor, scores under it are not kept so they needn't be computed in full either
+                raw[unscored] = numpy.rint(self._raw_scores(algo_name, cell_to, cells_from[pending[unscored]],
+                                                            retained.floor(column, algo_name)) * 100)
+                retained.put(column, algo_name, positions[pending[unscored]], raw[unscored])
+
+            # pairs left out by the length bound stay at -1 and fail any threshold
+            cell_scores = raw / 100
+            passed = cell_scores > threshold
+
+            algo_codes[pending[passed]] = self.__algo_codes[algo_name]
+            scores[pending[passed]] = cell_scores[passed]
+            pending = pending[~passed]
+
+        return algo_codes, scores
+
+    def _cached_column_score(self, cell_to, cells_from, column):
+
+        """Same as _column_score, but each distinct cell is scored once through the (column, cell_to, cell_from) LRU"""
+
+        distinct_cells, inverse = numpy.unique(cells_from, return_inverse=True)
+        distinct_algo_codes = numpy.zeros(len(distinct_cells), dtype=numpy.int8)
+        distinct_scores = numpy.zeros(len(distinct_cells))
+
+        for i, cell_from in enumerate(distinct_cells):
+            key = (column, cell_to, cell_from)
+            cell_score = self.__score_cache.get(key)
+
+            if cell_score is None:
+                algo_name, score = self._cell_score(cell_to, cell_from, column)
+                cell_score = (self.__algo_codes[algo_name], score)
+                self.__score_cache.put(key, cell_score)
+                self.__counters['cache_misses'] += 1
+            else:
+                self.__counters['cache_hits'] += 1
+
+            distinct_algo_codes[i], distinct_scores[i] = cell_score
+
+        return distinct_algo_codes[inverse], distinct_scores[inverse]
+
+    def _table_column_score(self, index_to, candidates, column):
+        algo_table, score_table = self.__score_tables[column]
+        code_to = self.__codes_to[column][index_to]
+        codes_from = self.__codes_from[column][candidates]
+
+        return algo_table[code_to, codes_from], score_table[code_to, codes_from]
+
+    def _build_score_tables(self):
+
+        """Runs the priority cascade once per distinct (cell_to, cell_from) pair of the dictionary encoded columns"""
+
+        self.__score_tables = {}
+
+        for column, (distinct_to, distinct_from) in self.__categories.items():
+            algo_table = numpy.zeros((len(distinct_to), len(distinct_from)), dtype=numpy.int8)
+            score_table = numpy.zeros((len(distinct_to), len(distinct_from)))
+
+            for code_to, cell_to in enumerate(distinct_to):
+                algo_table[code_to], score_table[code_to] = self._column_score(cell_to, distinct_from, column)
+
+            self.__score_tables[column] = (algo_table, score_table)
+
+    def _row_scores(self, index_to, candidates, retained=None, offset=0):
+
+        """
+        Scores candidates column by column, heaviest column first. A candidate is abandoned once its partial sum plus
+        the weight of every column left can no longer reach optimize_threshold, its remaining cells stay unmatched.
+        Given the row's RetainedScores, candidates sit at offset in its candidate set.
+        """
+
+        row_score = {column: numpy.zeros(len(candidates)) for column, _, _ in self.__weights}
+        row_algo = {column: numpy.zeros(len(candidates), dtype=numpy.int8) for column, _, _ in self.__weights}
+        row_score_sum = numpy.zeros(len(candidates))
+        active = numpy.arange(len(candidates))
+
+        for position, (column, u, remaining) in enumerate(self.__weights, 1):
+            if column in self.__score_tables:
+                algo_codes, scores = self._table_column_score(index_to, candidates[active], column)
+            elif column in self.__cached_columns:
+                algo_codes, scores = self._cached_column_score(self.__columns_to[column][index_to],
+                                                               self.__columns_from[column][candidates[active]], column)
+            elif retained is not None:
+                rows = candidates[active]
+                algo_codes, scores = self._retained_column_score(self.__columns_to[column][index_to],
+                                                                 self.__columns_from[column][rows], column,
+                                                                 self.__lengths_from[column][rows], retained,
+                                                                 offset + active)
+            else:
+                algo_codes, scores = self._column_score(self.__columns_to[column][index_to],
+                                                        self.__columns_from[column][candidates[active]], column,
+                                                        self.__lengths_from[column][candidates[active]])
+            row_score[column][active] = scores * u
+            row_algo[column][active] = algo_codes
+            row_score_sum[active] += row_score[column][active]
+
+            # small tolerance so rounding in the running sums never prunes a candidate sitting on the threshold
+            reachable = row_score_sum[active] + remaining + 1e-9 >= self.optimize_threshold
+            self.__counters['pruned_cells'] += int((~reachable).sum()) * (len(self.__weights) - position)
+            active = active[reachable]
+
+            if not len(active):
+                break
+
+        return row_score, row_algo, row_score_sum
+
+    def _join_keys(self, df):
+
+        """Returns one key per row, the normalized cells as they are so a join hit is an exact hit on every column"""
+
+        return list(zip(*[df[column].tolist() for column in self.exact_join_columns]))
+
+    def _build_join_index(self):
+        join_index = {}
+
+        for index_from, key in enumerate(self._join_keys(self.__normalized_from)):
+            join_index.setdefault(key, []).append(index_from)
+
+        return join_index
+
+    def _join_match(self, index_to):
+
+        """Returns the only match_from row sharing the join key of index_to, or None when there isn't exactly one"""
+
+        if not self.exact_join_columns:
+            return None
+
+        key = self.__join_keys_to[index_to]
+        candidates = self.__join_index.get(key, []) if all(key) else []
+
+        return candidates[0] if len(candidates) == 1 else None
+
+    def _join_top_matches(self, index_to, index_from):
+        row_score = []
+        row_algo = []
+
+        # the join key folds cells further than normalization does, so its columns go through the cascade like the rest
+        for column, u, _ in self.__weights:
+            algo_name, score = self._cell_score(self.__columns_to[column][index_to],
+                                                self.__columns_from[column][index_from], column)
+            row_score.append(score * u)
+            row_algo.append(self.__algo_codes[algo_name])
+
+        return (numpy.array([index_from], dtype=numpy.int64), numpy.array([sum(row_score)]), numpy.array([row_score]),
+                numpy.array([row_algo], dtype=numpy.int8),
+                numpy.array([MatchResults.statuses.index('MATCHED')], dtype=numpy.int8))
+
+    @staticmethod
+    def _blocking_key(cell, key_length):
+        key = str(cell).strip().lower()
+        return key[:key_length] if key_length else key
+
+    def _blocking_keys(self, df):
+        key_columns = [[self._blocking_key(cell, key_length) for cell in df[column].tolist()]
+                       for column, key_length in self.blocking_columns.items()]
+
+        return list(zip(*key_columns)) if key_columns else [()] * len(df)
+
+    def _build_blocks(self):
+        blocks = []
+        blocking_keys_from = self._blocking_keys(self.__normalized_from)
+
+        for depth in range(len(self.blocking_columns), 0, -1):
+            block = {}
+
+            for index_from, key in enumerate(blocking_keys_from):
+                block.setdefault(key[:depth], []).append(index_from)
+
+            blocks.append(block)
+
+        return blocks
+
+    def _block_candidates(self, index_to):
+
+        """Returns the match_from rows sharing a block with index_to, widening the block until one is found"""
+
+        blocking_key = self.__blocking_keys_to[index_to]
+
+        for depth, block in zip(range(len(blocking_key), 0, -1), self.__blocks):
+            key = blocking_key[:depth]
+
+            # a blank worksheet cell says nothing about the candidate, so skip to a wider block
+            if all(key) and key in block:
+                if depth < len(blocking_key):
+                    self.__counters['fallback_blocks'] += 1
+                return block[key]
+
+        if blocking_key:
+            self.__counters['fallback_blocks'] += 1
+
+        return range(0, len(self.match_from))
+
+    def _retrieve(self, index_to):
+
+        """Returns the sorted union of the candidates retrieved for index_to, or None when no index applies to it"""
+
+        retrieved = []
+
+        for column, ngram_index in self.__ngram_indexes.items():
+            cell_to = self.__retrieval_cells_to[column][index_to]
+
+            if cell_to:
+                retrieved.append(ngram_index.query(cell_to, self.fuzzy_threshold))
+
+        for column, phonetic_index in self.__phonetic_indexes.items():
+            codes = self.__phonetic_codes_to[column][index_to]
+
+            if codes:
+                retrieved.append(phonetic_index.query(codes))
+
+        return numpy.unique(numpy.concatenate(retrieved)) if retrieved else None
+
+    def _neighbors(self, index_to):
+
+        """Returns the sorted rows near index_to in every sorted neighborhood, or None when no neighborhood applies"""
+
+        neighbors = None
+
+        for column, neighborhood in self.__neighborhoods.items():
+            key = self.__neighborhood_keys_to[column][index_to]
+
+            if key:
+                rows = neighborhood.query(key)
+                neighbors = rows if neighbors is None else numpy.intersect1d(neighbors, rows, assume_unique=True)
+
+        return neighbors
+
+    def _tfidf_candidates(self):
+        tfidf_columns = [column for column in self.tfidf_columns
+                         if column in self.__normalized_to.columns and column in self.__normalized_from.columns]
+
+        cells_to = self.__normalized_to[tfidf_columns].agg(' '.join, axis=1).tolist()
+        cells_from = self.__normalized_from[tfidf_columns].agg(' '.join, axis=1).tolist()
+
+        return retrieval.TfidfIndex(cells_from).top_k(cells_to, self.tfidf_top_k, self.tfidf_chunk_size)
+
+    def _candidates(self, index_to):
+        if self.engine == 'tfidf':
+            return self.__tfidf_candidates[index_to]
+
+        candidates = numpy.asarray(self._block_candidates(index_to), dtype=int)
+        neighbors = self._neighbors(index_to)
+
+        # a sorted neighborhood narrows the block like a finer block, an empty one keeps the block as it is
+        if neighbors is not None:
+            narrowed = numpy.intersect1d(candidates, neighbors, assume_unique=True)
+
+            if len(narrowed):
+                self.__counters['neighborhood_avoided'] += len(candidates) - len(narrowed)
+                candidates = narrowed
+
+        retrieved = self._retrieve(index_to)
+
+        if retrieved is None:
+            return candidates
+
+        narrowed = numpy.intersect1d(candidates, retrieved, assume_unique=True)
+
+        # nothing was retrieved, the row may still match on its other columns so keep the whole block
+        if not len(narrowed):
+            return candidates
+
+        self.__counters['retrieved_rows'] += 1
+        self.__counters['retrieved_candidates'] += len(narrowed)
+        self.__counters['retrieval_avoided'] += len(candidates) - len(narrowed)
+
+        return narrowed
+
+    def _row_keys(self, df):
+
+        """Returns one 64 bit hash per row of every column matching, joining, blocking or retrieval looks at"""
+
+        columns = [*self.columns_to_match, *self.exact_join_columns, *self.blocking_columns, *self.ngram_columns,
+                   *self.phonetic_columns, *self.sorted_neighborhood_columns,
+                   *(self.tfidf_columns if self.engine == 'tfidf' else [])]
+        columns = [column for column in dict.fromkeys(columns) if column in df.columns]
+
+        return pandas.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+    @staticmethod
+    def _frame_version(columns, row_hashes):
+
+        """Returns a content hash of a frame from its column names and the hashes of its rows, in order"""
+
+        digest = hashlib.sha256(repr(list(columns)).encode())
+        digest.update(row_hashes.tobytes())
+
+        return digest.hexdigest()
+
+    def _moved_candidates(self, ids_from, hashes_from):
+
+        """
+        Diffs the previous match_from against the new one by candidate_id_column, returning an array mapping each
+        previous position to the new position of the same candidate, or -1 when it was removed or its row changed
+        """
+
+        previous = pandas.DataFrame({'id': self.__ids_from, 'hash': self.__hashes_from})
+        current = pandas.DataFrame({'id': ids_from, 'hash': hashes_from})
+
+        # ids repeated within either frame cannot be told apart, their candidates are scored again
+        previous = previous[~previous['id'].duplicated(keep=False)].reset_index(names='previous')
+        current = current[~current['id'].duplicated(keep=False)].reset_index(names='current')
+        unchanged = previous.merge(current, on=['id', 'hash'])
+
+        moved = numpy.full(len(self.__ids_from), -1, dtype=numpy.int64)
+        moved[unchanged['previous'].to_numpy()] = unchanged['current'].to_numpy()
+
+        self.__from_changes = {'added': len(ids_from) - len(unchanged),
+                               'removed': len(self.__ids_from) - len(unchanged)}
+
+        return moved
 
     def setup(self, columns):
 
         self.match_to = self.match_to.astype('string').replace(pandas.NA, '')
         self.match_from = self.match_from.astype('string').replace(pandas.NA, '')
 
+        self.__normalized_to, times_to = normalize.normalize(self.match_to, self.normalization)
+        self.__normalized_from, times_from = normalize.normalize(self.match_from, self.normalization)
+        self.__normalization_times = {step: times_to[step] + times_from[step] for step in times_to}
+
+        normalized_to, normalized_from = self.__normalized_to, self.__normalized_from
+
         # FIXME: Adjusted column accounts only for number of selected columns, where a correct match between two
         #        different column names will exceed the adjusted percentage.
 
-        self.__uniqueness_to = pdext.analysis.adjusted_column_uniqueness(self.match_to, self.columns_to_match.keys())
-        self.__uniqueness_from = pdext.analysis.adjusted_column_uniqueness(self.match_from, self.columns_to_match.keys())
+        self.__uniqueness_to = analysis.adjusted_column_uniqueness(normalized_to, self.columns_to_match.keys())
+        self.__uniqueness_from = analysis.adjusted_column_uniqueness(normalized_from, self.columns_to_match.keys())
 
         if self.auto_optimize:
             self.optimize_threshold = max(self.__uniqueness_to)
@@ -98,82 +1149,405 @@ class PandasMatcher:
         if not self.optimize:
             self.optimize_threshold = self.total_threshold
 
+        weights = sorted(self.__uniqueness_to.items(), key=lambda column_weight: column_weight[1], reverse=True)
+        remaining = numpy.cumsum([0.0] + [u for _, u in reversed(weights)])[-2::-1]
+        self.__weights = [(column, u, float(r)) for (column, u), r in zip(weights, remaining)]
+        self.__columns_to = {column: normalized_to[column].tolist() for column, _, _ in self.__weights}
+        self.__columns_from = {column: numpy.array(normalized_from[column].tolist(), dtype=object)
+                               for column, _, _ in self.__weights}
+        self.__lengths_from = {column: normalized_from[column].str.len().to_numpy(dtype=int)
+                               for column, _, _ in self.__weights}
+
+        self.__codes_to, self.__codes_from, self.__categories = {}, {}, {}
+        self.__cached_columns = set()
+
+        for column, _, _ in self.__weights:
+            if normalized_from[column].nunique() > self.cache_cardinality_limit:
+                continue
+
+            if normalized_to[column].nunique() > self.cache_cardinality_limit:
+                self.__cached_columns.add(column)
+                continue
+
+            self.__codes_to[column], distinct_to = pandas.factorize(normalized_to[column])
+            self.__codes_from[column], distinct_from = pandas.factorize(normalized_from[column])
+            self.__categories[column] = (numpy.array(distinct_to.tolist(), dtype=object),
+                                         numpy.array(distinct_from.tolist(), dtype=object))
+
+        self.__join_keys_to = self._join_keys(normalized_to)
+        self.__join_index = self._build_join_index()
+
+        self.__ngram_indexes = {column: retrieval.NGramIndex(normalized_from[column].tolist(), self.ngram_size)
+                                for column in self.ngram_columns}
+        self.__retrieval_cells_to = {column: normalized_to[column].tolist() for column in self.ngram_columns}
+
+        self.__phonetic_indexes = {column: retrieval.PhoneticIndex(normalized_from[column], encoding)
+                                   for column, encoding in self.phonetic_columns.items()}
+        self.__phonetic_codes_to = {column: phonetic_index.encode(normalized_to[column])
+                                    for column, phonetic_index in self.__phonetic_indexes.items()}
+
+        self.__neighborhoods = {column: retrieval.SortedNeighborhood(normalized_from[column], window)
+                                for column, window in self.sorted_neighborhood_columns.items()}
+        self.__neighborhood_keys_to = {column: retrieval.SortedNeighborhood.normalize(normalized_to[column]).tolist()
+                                       for column in self.__neighborhoods}
+        self.__tfidf_candidates = self._tfidf_candidates() if self.engine == 'tfidf' else []
+
+        self.__blocking_keys_to = self._blocking_keys(normalized_to)
+        self.__blocks = self._build_blocks()
+
+        # codes follow first appearance, so the first row of each code comes out in match_to order
+        self.__fingerprints_to = self._row_keys(normalized_to)
+        self.__row_codes_to, _ = pandas.factorize(self.__fingerprints_to)
+        self.__unique_to = numpy.unique(self.__row_codes_to, return_index=True)[1]
+
+        # candidate rows of retained scores are positions in match_from, they are moved to the new positions of the
+        # unchanged candidates when match_from changed, or dropped when candidates cannot be identified. Rows edited
+        # since the last setup() get a new fingerprint and are scored from scratch, the others are not.
+        hashes_from = pandas.util.hash_pandas_object(normalized_from, index=False).to_numpy()
+        ids_from = self.match_from[self.candidate_id_column].to_numpy(dtype=object) \
+            if self.candidate_id_column in self.match_from.columns else None
+        from_version = self._frame_version(normalized_from.columns, hashes_from)
+        self.__from_changes = {'added': 0, 'removed': 0}
+
+        fingerprints = set(self.__fingerprints_to.tolist()) if self.retain_scores else set()
+        self.__retained_scores = {fingerprint: retained for fingerprint, retained in self.__retained_scores.items()
+                                  if fingerprint in fingerprints}
+
+        if from_version != self.__from_version:
+            if ids_from is not None and len(self.__ids_from) and self.__retained_scores:
+                moved = self._moved_candidates(ids_from, hashes_from)
+                self.__retained_scores = {fingerprint: retained.relocate(moved)
+                                          for fingerprint, retained in self.__retained_scores.items()}
+            else:
+                self.__retained_scores = {}
+
+        self.__from_version = from_version
+        self.__ids_from = ids_from if ids_from is not None else numpy.array([], dtype=object)
+        self.__hashes_from = hashes_from
+
+    def _match_row(self, index_to):
+        index_from = self._join_match(index_to)
+
+        if index_from is not None:
+            self.__counters['exact_join_rows'] += 1
+            return self._join_top_matches(index_to, index_from)
+
+        self.__counters['fuzzy_rows'] += 1
+        top_matches = TopMatches(self.optimize_threshold, [column for column, _, _ in self.__weights])
+        candidates = self._candidates(index_to)
+        retained = None
+
+        if self.retain_scores:
+            fingerprint = int(self.__fingerprints_to[index_to])
+            retained = self.__retained_scores.get(fingerprint)
+
+            if retained is None:
+                retained = RetainedScores(candidates)
+            else:
+                retained = retained.realign(candidates)
+                self.__counters['retained_rows'] += 1
+
+            self.__retained_scores[fingerprint] = retained
+
+        # scoring in chunks keeps the per column vectors bounded even when a row falls back to a full scan
+        for start in range(0, len(candidates), self.chunk_size):
+            chunk = candidates[start:start + self.chunk_size]
+            row_score, row_algo, row_score_sum = self._row_scores(index_to, chunk, retained, start)
+            top_matches.update(chunk, row_score, row_algo, row_score_sum)
+
+        return top_matches.results(self.total_threshold)
+
+    def _match_rows(self, indices_to):
+        counters = dict(self.__counters)
+        matched = {index_to: self._match_row(index_to) for index_to in indices_to}
+        fingerprints = [int(self.__fingerprints_to[index_to]) for index_to in indices_to]
+        retained = {fingerprint: self.__retained_scores[fingerprint] for fingerprint in fingerprints
+                    if fingerprint in self.__retained_scores}
+
+        return matched, {k: v - counters[k] for k, v in self.__counters.items()}, retained
+
+    def _match_parallel(self, indices_to):
+
+        """
+        Shards match_to rows across a process pool, each worker receives a copy of the matcher only once. Yields
+        (index_to, top_matches) shard by shard, in the order of indices_to.
+        """
+
+        shard_size = max(1, math.ceil(len(indices_to) / (self.workers * 4)))
+        shards = [indices_to[i:i + shard_size] for i in range(0, len(indices_to), shard_size)]
+
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self,)) as executor:
+
+            # workers score against their own copy of __retained_scores, so what they kept is brought back here
+            for shard_matched, counters, retained in executor.map(_match_shard, shards):
+                self.__retained_scores.update(retained)
+
+                for k, v in counters.items():
+                    self.__counters[k] += v
+
+                yield from shard_matched.items()
+
+    def _match_unique(self):
+
+        """
+        Matches the first match_to row of every row code, yielding (index_to, results() arrays) as each row is done.
+        Once exhausted, __matched holds the results of every match_to row.
+        """
+
+        self.__counters = dict.fromkeys(self.__counters, 0)
+
+        # cached scores and score tables depend on thresholds and priorities, which may have changed since setup()
+        self.__score_cache = ScoreCache(self.cache_size)
+        self._build_score_tables()
+
+        indices_to = self.__unique_to.tolist()
+        matched = {}
+
+        if self.workers > 1:
+            results = self._match_parallel(indices_to)
+        else:
+            results = ((index_to, self._match_row(index_to)) for index_to in indices_to)
+
+        for index_to, top_matches in tqdm(results, total=len(indices_to), desc="Progress"):
+            matched[index_to] = top_matches
+            yield index_to, top_matches
+
+        # repeated worksheet rows share the top_matches of the first row with the same key
+        self.__matched = MatchResults.from_top_matches([column for column, _, _ in self.__weights], self.__algo_names,
+                                                       [matched[index_to] for index_to in indices_to],
+                                                       self.__row_codes_to)
+        self.__counters['duplicate_rows'] = len(self.__row_codes_to) - len(indices_to)
+
+        self.__total_count = len(self.match_to)
+
+    def iter_match(self):
+
+        """
+        Generator version of match(), yields (index_to, top_matches) for each match_to row as soon as it is matched,
+        repeated rows come out together with the first row sharing their key. matched is complete once exhausted.
+        """
+
+        columns = [column for column, _, _ in self.__weights]
+        duplicates = [[] for _ in range(0, len(self.__unique_to))]
+
+        for index_to, code in enumerate(self.__row_codes_to.tolist()):
+            duplicates[code].append(index_to)
+
+        for index_to, top_matches in self._match_unique():
+            top_matches = MatchResults.as_top_matches(columns, self.__algo_names, *top_matches)
+
+            for duplicate in duplicates[self.__row_codes_to[index_to]]:
+                yield duplicate, top_matches
+
     def match(self):
+        for _ in self._match_unique():
+            pass
+
+    def cache_key(self):
+
+        """
+        Returns a content hash of the matched columns of match_to, the whole of match_from and every setting results
+        depend on, stable across sessions so results_snapshot() can be stored under it. Does not need setup().
+        """
+
+        match_to = self.match_to.astype('string').replace(pandas.NA, '')
+        match_from = self.match_from.astype('string').replace(pandas.NA, '')
+        settings = {name: getattr(self, name) for name in
+                    ['optimize', 'auto_optimize', 'fuzzy_threshold', 'partial_fuzzy_threshold', 'token_set_threshold',
+                     'total_threshold', 'optimize_threshold', 'match_priority_default', 'match_priority_by_column',
+                     'columns_to_match', 'normalization', 'blocking_columns', 'exact_join_columns', 'ngram_columns',
+                     'ngram_size', 'phonetic_columns', 'sorted_neighborhood_columns', 'engine', 'tfidf_columns',
+                     'tfidf_top_k']}
+
+        # rapidfuzz and fuzzywuzzy disagree on some partial_ratio and token_set scores
+        scorers = {algo_name: self._scorer(algo_name)[2] for algo_name in self.__scorers}
+        digest = hashlib.sha256(repr((settings, scorers)).encode())
+        digest.update(self._row_keys(match_to).tobytes())
+        digest.update(self._frame_version(match_from.columns,
+                                          pandas.util.hash_pandas_object(match_from, index=False).to_numpy()).encode())
+
+        return digest.hexdigest()
+
+    def results_snapshot(self):
+
+        """Returns the results match() leaves behind, picklable, for restore_results() to put back without matching"""
+
+        return {'matched': self.__matched,
+                'counters': dict(self.__counters),
+                'total_count': self.__total_count,
+                'normalization_times': dict(self.__normalization_times)}
+
+    def restore_results(self, snapshot):
+        self.__matched = snapshot['matched']
+        self.__counters = snapshot['counters']
+        self.__total_count = snapshot['total_count']
+        self.__normalization_times = snapshot['normalization_times']
+
+    def match_to_file(self, filepath, columns):
 
-        for index_to in tqdm(range(0, len(self.match_to)), desc="Progress"):
+        """Runs iter_match(), appending each matched worksheet row to the csv at filepath through a MatchWriter"""
 
-            # {row_1: {column_1: score_1, column_2: score_2...}, row_2:{...}}
-            passable_matches_row_score = {}
-            # {row_1: {column_1: score_1, column_2: score_2...}, row_2:{...}}
-            passable_matches_algo = {}
-            # {row_1: sum_score_1, row_2: sum_score_2...}
-            passable_matches_row_score_sum = {}
+        with MatchWriter(filepath, self.match_to, self.match_from, columns) as writer:
+            for index_to, top_matches in self.iter_match():
+                writer.write(index_to, top_matches)
 
-            for index_from in tqdm(range(0, len(self.match_from)), leave=False, desc="Matching"):
-                row_score, row_algo = self._row_score(self.match_to.iloc[index_to],
-                                                      self.match_from.iloc[index_from])
-                row_score_sum = sum(row_score.values())
+    def matched_to_file(self, filepath, columns):
 
-                if row_score_sum >= self.optimize_threshold:
-                    passable_matches_row_score[index_from] = row_score
-                    passable_matches_algo[index_from] = row_algo
-                    passable_matches_row_score_sum[index_from] = row_score_sum
+        """Writes the current results to the csv at filepath through a MatchWriter, without matching again"""
 
-            top_matches = {}
+        with MatchWriter(filepath, self.match_to, self.match_from, columns) as writer:
+            for index_to, top_matches in self.__matched.items():
+                writer.write(index_to, top_matches)
 
-            if passable_matches_row_score_sum:
-                for k in self.highest(passable_matches_row_score_sum):
-                    status = 'MATCHED' if passable_matches_row_score_sum[k] >= self.total_threshold else 'REVIEW'
-                    top_matches[k] = {'row_score_sum': passable_matches_row_score_sum[k],
-                                      'row_score': passable_matches_row_score[k],
-                                      'row_algo': passable_matches_algo[k],
-                                      'match_status': status}
+    def _status_counts(self):
+        counts = self.__matched.counts()
+        matched = self.__matched.status[self.__matched.starts[counts == 1]] == MatchResults.statuses.index('MATCHED')
 
-            self.__matched[index_to] = top_matches
-            self.__total_count = len(self.match_to)
+        return {'MATCHED': int(matched.sum()),
+                'REVIEW': int((~matched).sum()),
+                'AMBIGUOUS': int((counts > 1).sum()),
+                'UNMATCHED': int((counts == 0).sum())}
+
+    def sweep(self, fuzzy_thresholds=None, token_set_thresholds=None, total_thresholds=None, optimize_thresholds=None):
+
+        """
+        Returns a pandas.DataFrame of MATCHED, REVIEW, AMBIGUOUS and UNMATCHED counts for every combination of the
+        threshold grids, a missing grid keeps the current value. Cells are scored by the first combination only, the
+        others re-apply the cascade to the retained scores. Counts come from the stored statuses, so exact join rows
+        stay MATCHED as in match(). Without optimize, optimize_threshold follows total_threshold as in setup() and
+        optimize_thresholds is ignored. The thresholds and results in place before the sweep are restored.
+        """
+
+        settings = {name: getattr(self, name) for name in ['fuzzy_threshold', 'token_set_threshold', 'total_threshold',
+                                                           'optimize_threshold']}
+        retain_scores = self.retain_scores
+        grids = {'fuzzy_threshold': fuzzy_thresholds,
+                 'token_set_threshold': token_set_thresholds,
+                 'total_threshold': total_thresholds,
+                 'optimize_threshold': optimize_thresholds}
+        grids = {name: values if values is not None else [settings[name]] for name, values in grids.items()}
+
+        # without optimize, rows below total_threshold are UNMATCHED rather than REVIEW, as setup() ties the two
+        if not self.optimize:
+            grids['optimize_threshold'] = [None]
+
+        # [{threshold_1: value_1...}, ...], one match() per entry, the stored statuses depend on total_threshold
+        runs = [dict(zip(grids, values)) for values in itertools.product(*grids.values())]
+
+        for run_settings in runs:
+            if run_settings['optimize_threshold'] is None:
+                run_settings['optimize_threshold'] = run_settings['total_threshold']
+
+        results = []
+        self.retain_scores = True
+
+        try:
+            for run_settings in runs:
+                for name, value in run_settings.items():
+                    setattr(self, name, value)
+
+                self.match()
+                results.append({**run_settings, **self._status_counts()})
+
+            # the results of the original thresholds are put back while the scores are still retained
+            for name, value in settings.items():
+                setattr(self, name, value)
+
+            self.match()
+        finally:
+            for name, value in settings.items():
+                setattr(self, name, value)
+
+            self.retain_scores = retain_scores
+
+            if not retain_scores:
+                self.__retained_scores = {}
+
+        return pandas.DataFrame(results, columns=['fuzzy_threshold', 'token_set_threshold', 'total_threshold',
+                                                  'optimize_threshold', 'MATCHED', 'REVIEW', 'AMBIGUOUS', 'UNMATCHED'])
 
     def apply_to_columns(self, columns):
 
-        """Copies matched column data from match_from to match_to, overwrites data in match_to"""
+        """Copies matched column data from match_from into matched_df, a copy of match_to, match_to is left untouched"""
 
-        self.__matched_df = self.match_to
+        counts = self.__matched.counts()
+        single = numpy.flatnonzero(counts == 1)
+        entries = self.__matched.starts[single]
+        rows_from = self.__matched.index_from[entries]
 
-        for index_to, top_matches in self.__matched.items():
+        matched_df = self.match_to.copy()
 
-            if len(top_matches) == 1:
-                i = next(iter(top_matches))
+        # one positional take from match_from, each column assigned to every uniquely matched row at once
+        taken = self.match_from[list(columns)].iloc[rows_from]
 
-                for column in columns:
-                    self.__matched_df.at[index_to, column] = self.match_from.at[i, column]
+        for column in columns:
+            if column not in matched_df:
+                matched_df[column] = pandas.Series(index=matched_df.index, dtype=taken[column].dtype)
 
-                self.__matched_df.at[index_to, 'matched_row'] = i + 2
-                self.__matched_df.at[index_to, 'match_score'] = top_matches[i]['row_score_sum']
-                self.__matched_df.at[index_to, 'match_status'] = top_matches[i]['match_status']
+            matched_df.iloc[single, matched_df.columns.get_loc(column)] = taken[column].to_numpy()
 
-            elif len(top_matches) >= 1:
-                i = ', '.join(top_matches.keys())
+        matched_row = numpy.full(len(matched_df), numpy.nan, dtype=object)
+        match_score = numpy.full(len(matched_df), numpy.nan)
+        match_status = numpy.full(len(matched_df), 'UNMATCHED', dtype=object)
 
-                self.__matched_df.at[index_to, 'matched_row'] = i
-                self.__matched_df.at[index_to, 'match_status'] = 'AMBIGUOUS MATCH'
+        matched_row[single] = rows_from + 2
+        match_score[single] = self.__matched.row_score_sum[entries]
+        match_status[single] = numpy.array(MatchResults.statuses, dtype=object)[self.__matched.status[entries]]
 
-            else:
-                self.__matched_df.at[index_to, 'match_status'] = 'UNMATCHED'
+        for index_to in numpy.flatnonzero(counts > 1):
+            index_from = self.__matched.index_from[self.__matched.starts[index_to]:self.__matched.ends[index_to]]
+            matched_row[index_to] = ', '.join(map(str, index_from))
+            match_status[index_to] = 'AMBIGUOUS MATCH'
+
+        matched_df['matched_row'] = matched_row
+        matched_df['match_score'] = match_score
+        matched_df['match_status'] = match_status
+
+        self.__matched_df = matched_df
 
     def results_description(self):
         return {"Total number of rows": self.__total_count,
                 "Number of total matches": self.__total_matched_count,
                 "Matches passed": self.__pass_matched_count,
-                "Matches needs review": self.__review_matched_count}
+                "Matches needs review": self.__review_matched_count,
+                "Rows resolved by exact join": self.__counters['exact_join_rows'],
+                "Rows resolved by fuzzy pass": self.__counters['fuzzy_rows'],
+                "Duplicate rows matched once": self.__counters['duplicate_rows'],
+                "Rows matched against a wider block": self.__counters['fallback_blocks'],
+                "Rows narrowed by candidate retrieval": self.__counters['retrieved_rows'],
+                "Candidates retrieved": self.__counters['retrieved_candidates'],
+                "Comparisons avoided by candidate retrieval": self.__counters['retrieval_avoided'],
+                "Comparisons avoided by sorted neighborhood": self.__counters['neighborhood_avoided'],
+                "fuzzy_simple scores avoided by length bound": self.__counters['length_pruned'],
+                "Cell scores skipped by pruning": self.__counters['pruned_cells'],
+                "Score cache hits": self.__counters['cache_hits'],
+                "Score cache misses": self.__counters['cache_misses'],
+                "Rows re-evaluated from retained scores": self.__counters['retained_rows'],
+                "Candidates added or changed since last setup": self.__from_changes['added'],
+                "Candidates removed since last setup": self.__from_changes['removed'],
+                "Cell scores reused from earlier runs": self.__counters['retained_hits'],
+                **{f"Normalization {step} (s)": round(seconds, 4)
+                   for step, seconds in self.__normalization_times.items()}}
+
+    @property
+    def matched(self):
+        return self.__matched
 
     @property
     def matched_df(self):
         return self.__matched_df
 
     def get_algo_breakdown(self):
-        pass
+
+        """Returns a pandas.DataFrame counting the top matches each algorithm scored, algorithms by columns"""
+
+        return self.__matched.algo_breakdown()
 
     def get_score_breakdown(self):
-        pass
+
+        """Returns a pandas.DataFrame of the number of top matches and their mean scores, per match_status"""
+
+        return self.__matched.score_breakdown()
 
     def export(self, filepath):
         if not self.__matched_df.empty:
@@ -189,4 +1563,5 @@ class PandasMatcher:
 
     @staticmethod
     def highest(y):
-        return [k for k, v in y.items() if v == max(y.values())]
+        highest_value = max(y.values())
+        return [k for k, v in y.items() if v == highest_value]
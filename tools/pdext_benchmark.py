@@ -0,0 +1,134 @@
+import os
+import sys
+import time
+import random
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas
+from fuzzywuzzy import fuzz
+from tools import analysis
+from tools import pdext
+
+
+LASTNAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+             'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin']
+FIRSTNAMES = ['Robert', 'John', 'Michael', 'William', 'David', 'Mary', 'Patricia', 'Jennifer', 'Linda', 'James']
+STATES = ['Ohio', 'Texas', 'Iowa', 'Utah', 'Maine', 'Idaho', 'Oregon', 'Nevada']
+OFFICES = ['State House', 'State Senate', 'Governor', 'U.S. House']
+PARTIES = ['Democratic', 'Republican', 'Independent', 'Libertarian']
+
+
+def generate(rows_to=50, rows_from=1000, seed=0):
+
+    """Returns a (match_to, match_from) pair where match_to rows are lightly misspelled copies of match_from rows"""
+
+    r = random.Random(seed)
+    match_from = pandas.DataFrame({'lastname': [r.choice(LASTNAMES) for _ in range(rows_from)],
+                                   'firstname': [r.choice(FIRSTNAMES) for _ in range(rows_from)],
+                                   'state': [r.choice(STATES) for _ in range(rows_from)],
+                                   'office': [r.choice(OFFICES) for _ in range(rows_from)],
+                                   'party': [r.choice(PARTIES) for _ in range(rows_from)]})
+
+    match_to = match_from.sample(rows_to, random_state=seed).reset_index(drop=True)
+    match_to['lastname'] = [name[:-1] + 'x' if r.random() < 0.3 else name for name in match_to['lastname']]
+
+    return match_to, match_from
+
+
+def legacy_cell_score(pandas_matcher, cell_to, cell_from, column):
+
+    """The priority cascade of one cell scored with fuzzywuzzy directly, independent of the matcher's own scorers"""
+
+    scorers = {'fuzzy_simple': (fuzz.ratio, pandas_matcher.fuzzy_threshold),
+               'fuzzy_partial': (fuzz.partial_ratio, pandas_matcher.partial_fuzzy_threshold),
+               'token_set': (fuzz.token_set_ratio, pandas_matcher.token_set_threshold)}
+
+    for algo_name in pandas_matcher.match_priority_by_column.get(column, pandas_matcher.match_priority_default):
+        if algo_name == 'exact':
+            cell_score = 1.0 if cell_to == cell_from else 0.0
+        elif algo_name == 'alias':
+            cell_score = pandas_matcher._alias(cell_to, cell_from)
+        else:
+            scorer, threshold = scorers[algo_name]
+            score = float(scorer(cell_to, cell_from)) / 100
+            cell_score = score if score > threshold else 0.0
+
+        if cell_score:
+            return algo_name, cell_score
+
+    return 'unmatched', float(0)
+
+
+def legacy_match(pandas_matcher):
+
+    """Row-wise reference loop indexing DataFrame rows with .iloc, as match() did before the columnar engine"""
+
+    uniqueness_to = analysis.adjusted_column_uniqueness(pandas_matcher.match_to,
+                                                        pandas_matcher.columns_to_match.keys())
+    matched = {}
+
+    for index_to in range(0, len(pandas_matcher.match_to)):
+        passable_matches = {}
+
+        for index_from in range(0, len(pandas_matcher.match_from)):
+            row_to = pandas_matcher.match_to.iloc[index_to]
+            row_from = pandas_matcher.match_from.iloc[index_from]
+
+            row_score = {}
+            row_algo = {}
+
+            for column, u in uniqueness_to.items():
+                algo_name, score = legacy_cell_score(pandas_matcher, row_to[column], row_from[column], column)
+                row_score[column] = score * u
+                row_algo[column] = algo_name
+
+            row_score_sum = sum(row_score.values())
+
+            if row_score_sum >= pandas_matcher.optimize_threshold:
+                passable_matches[index_from] = (row_score_sum, row_score, row_algo)
+
+        top_matches = {}
+
+        if passable_matches:
+            for k in pandas_matcher.highest({k: v[0] for k, v in passable_matches.items()}):
+                row_score_sum, row_score, row_algo = passable_matches[k]
+                status = 'MATCHED' if row_score_sum >= pandas_matcher.total_threshold else 'REVIEW'
+                top_matches[k] = {'row_score_sum': row_score_sum,
+                                  'row_score': row_score,
+                                  'row_algo': row_algo,
+                                  'match_status': status}
+
+        matched[index_to] = top_matches
+
+    return matched
+
+
+def run(rows_to=50, rows_from=1000):
+    match_to, match_from = generate(rows_to, rows_from)
+    columns = list(match_from.columns)
+
+    pm = pdext.PandasMatcher()
+    pm.match_to = match_to
+    pm.match_from = match_from
+    pm.columns_to_match = {column: column for column in columns}
+    pm.setup(columns)
+
+    start = time.perf_counter()
+    legacy_matched = legacy_match(pm)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pm.match()
+    match_time = time.perf_counter() - start
+
+    return {"Rows": f"{rows_to} x {rows_from}",
+            "Legacy .iloc loop (s)": round(legacy_time, 3),
+            "PandasMatcher.match (s)": round(match_time, 3),
+            "Speedup": round(legacy_time / match_time, 2),
+            "Identical results": legacy_matched == pm.matched}
+
+
+if __name__ == "__main__":
+    for k, v in run().items():
+        print(f"{k}: {v}")
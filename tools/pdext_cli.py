@@ -270,7 +270,7 @@ class ConfigureMatchOrder(cli.LinkNodeBundle):
     @cli.objects.Command()
     def _verify_swap(self, x):
         swap_values = x.split('>')
-        verification = ['1', '2', '3', '4']
+        verification = [str(i) for i in range(1, len(self.pandas_matcher.match_priority_default) + 1)]
 
         if 1 < len(swap_values) <= 2:
             if swap_values[0] in verification and swap_values[1] in verification:
@@ -339,7 +339,9 @@ class ConfigureMatchColumnOrder(cli.LinkNodeBundle):
     @cli.objects.Command()
     def _verify_swap(self, x):
         swap_values = x.split('>')
-        verification = ['1', '2', '3', '4']
+        column = str(self.__prompt_0.options[self.__prompt_0.get_user_response()])
+        priority = self.pandas_matcher.match_priority_by_column.get(column, self.pandas_matcher.match_priority_default)
+        verification = [str(i) for i in range(1, len(priority) + 1)]
 
         if 1 < len(swap_values) <= 2:
             if swap_values[0] in verification and swap_values[1] in verification:
@@ -372,9 +374,10 @@ class ConfigureMatchColumnOrder(cli.LinkNodeBundle):
                 {column: list(self.pandas_matcher.match_priority_default)})
 
         p_tuples = self.pandas_matcher.match_priority_by_column.items()
+        longest = max(len(v) for _, v in p_tuples)
 
-        self.__table.matrix = [["Match Order", '1', '2', '3', '4']] + \
-                              [[k] + v for k, v in p_tuples]
+        self.__table.matrix = [["Match Order"] + [str(o) for o in range(1, longest + 1)]] + \
+                              [[k] + v + [''] * (longest - len(v)) for k, v in p_tuples]
 
         self.__node_F.set_next(self.__node_L)
 
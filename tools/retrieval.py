@@ -0,0 +1,198 @@
+import numpy
+import pandas
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+except ImportError:
+    TfidfVectorizer = None
+
+try:
+    from metaphone import doublemetaphone
+except ImportError:
+    doublemetaphone = None
+
+
+# vowels (and Y) separate repeated codes and are dropped afterwards, H and W neither separate nor count
+SOUNDEX_CODES = str.maketrans({**dict.fromkeys('AEIOUY', '0'), **dict.fromkeys('HW', ''),
+                               **dict.fromkeys('BFPV', '1'), **dict.fromkeys('CGJKQSXZ', '2'),
+                               **dict.fromkeys('DT', '3'), 'L': '4', **dict.fromkeys('MN', '5'), 'R': '6'})
+
+
+def soundex(cells):
+
+    """Returns a pandas.Series of American Soundex codes, computed with vectorized .str operations"""
+
+    letters = pandas.Series(cells, dtype='string').fillna('').str.upper().str.replace('[^A-Z]', '', regex=True)
+    first = letters.str[0].fillna('')
+
+    digits = letters.str.translate(SOUNDEX_CODES).str.replace(r'(\d)\1+', r'\1', regex=True)
+    digits = digits.where(first.isin(['H', 'W']), digits.str[1:]).str.replace('0', '')
+
+    codes = (first + digits).str.ljust(4, '0').str[:4]
+
+    return codes.where(first != '', '').astype(object)
+
+
+def double_metaphone(cells):
+
+    """Returns a pandas.DataFrame with the primary and secondary Double Metaphone code of each distinct cell"""
+
+    if doublemetaphone is None:
+        raise ImportError("Double Metaphone codes require the metaphone package.")
+
+    cells = pandas.Series(cells, dtype=object).fillna('')
+    distinct = pandas.Series(cells.unique())
+    codes = pandas.DataFrame(distinct.map(doublemetaphone).tolist(), index=distinct, columns=['primary', 'secondary'])
+
+    return codes.reindex(cells).reset_index(drop=True)
+
+
+class NGramIndex:
+
+    """
+    Inverted index of the character n-grams of a column. Retrieves only the rows sharing enough n-grams with a value to
+    possibly score above a fuzz.ratio threshold, without looking at the rows that share none.
+    """
+
+    def __init__(self, cells, n=3):
+
+        self.n = n
+
+        self.__lengths = numpy.array([len(cell) for cell in cells], dtype=int)
+        self.__gram_counts = numpy.zeros(len(cells), dtype=int)
+
+        postings = {}
+
+        for row, cell in enumerate(cells):
+            grams = self.grams(cell)
+            self.__gram_counts[row] = len(grams)
+
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+
+        # {n-gram_1: array([row_1, row_2...]), n-gram_2: ...}
+        self.__postings = {gram: numpy.array(rows, dtype=int) for gram, rows in postings.items()}
+
+    def grams(self, cell):
+        padded = ' ' * (self.n - 1) + cell + ' ' * (self.n - 1) if cell else ''
+        return {padded[i:i + self.n] for i in range(0, len(padded) - self.n + 1)}
+
+    def query(self, cell, threshold):
+
+        """Returns the sorted rows whose n-gram overlap with cell allows a ratio above threshold"""
+
+        grams = self.grams(cell)
+        postings = [self.__postings[gram] for gram in grams if gram in self.__postings]
+
+        if not postings:
+            return numpy.array([], dtype=int)
+
+        rows, shared = numpy.unique(numpy.concatenate(postings), return_counts=True)
+
+        # ratio = 1 - distance / (len_a + len_b), where each insertion or deletion breaks at most n n-grams. Half a
+        # percent of slack covers the rounding of scores to whole percentages.
+        lengths = len(cell) + self.__lengths[rows]
+        max_distance = numpy.floor((1 - threshold + 0.005) * lengths)
+        required = numpy.maximum(len(grams), self.__gram_counts[rows]) - self.n * max_distance
+
+        return rows[shared >= numpy.maximum(required, 1)]
+
+
+class TfidfIndex:
+
+    """
+    Sparse TF-IDF vectors of the character n-grams of match_from strings. Candidates for a batch of match_to strings are
+    the rows with the highest cosine similarity, found through one sparse matrix product per chunk of match_to.
+    """
+
+    def __init__(self, cells, ngram_range=(2, 3)):
+
+        if TfidfVectorizer is None:
+            raise ImportError("The tfidf engine requires scikit-learn.")
+
+        self.vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=ngram_range, lowercase=True)
+        self.__matrix = self.vectorizer.fit_transform(cells).T.tocsr()
+
+    def top_k(self, cells, k=20, chunk_size=256, max_entries=2000000):
+
+        """
+        Returns one sorted array of candidate rows per cell, the k most similar rows with a similarity above 0. Common
+        n-grams make the product close to dense, so chunks shrink until chunk rows * match_from rows fit max_entries.
+        """
+
+        matrix_to = self.vectorizer.transform(cells)
+        chunk_size = max(1, min(chunk_size, max_entries // max(1, self.__matrix.shape[1])))
+        candidates = []
+
+        for start in range(0, matrix_to.shape[0], chunk_size):
+            similarities = (matrix_to[start:start + chunk_size] @ self.__matrix).tocsr()
+
+            for i in range(0, similarities.shape[0]):
+                row = similarities.indices[similarities.indptr[i]:similarities.indptr[i + 1]]
+                scores = similarities.data[similarities.indptr[i]:similarities.indptr[i + 1]]
+
+                if len(row) > k:
+                    row = row[numpy.argpartition(scores, -k)[-k:]]
+
+                candidates.append(numpy.sort(row))
+
+        return candidates
+
+
+class PhoneticIndex:
+
+    """Maps the phonetic codes of a column to its rows, so misspelled values sounding alike land in the same bucket"""
+
+    encodings = {'soundex': soundex, 'metaphone': double_metaphone}
+
+    def __init__(self, cells, encoding='soundex'):
+
+        self.encoding = encoding
+
+        rows = {}
+
+        for row, codes in enumerate(self.encode(cells)):
+            for code in codes:
+                rows.setdefault(code, []).append(row)
+
+        # {code_1: array([row_1, row_2...]), code_2: ...}
+        self.__rows = {code: numpy.array(row_list, dtype=int) for code, row_list in rows.items()}
+
+    def encode(self, cells):
+
+        """Returns one tuple of non-blank codes per cell, computed for the whole column at once"""
+
+        codes = self.encodings[self.encoding](cells)
+        codes = codes.to_frame() if isinstance(codes, pandas.Series) else codes
+
+        return [tuple(code for code in dict.fromkeys(row_codes) if code) for row_codes in codes.itertuples(index=False)]
+
+    def query(self, codes):
+        rows = [self.__rows[code] for code in codes if code in self.__rows]
+        return numpy.unique(numpy.concatenate(rows)) if rows else numpy.array([], dtype=int)
+
+
+class SortedNeighborhood:
+
+    """
+    Sorts a column by its normalized value. A value's candidates are every row sharing its key, plus window rows on
+    either side of that run, so common keys never lose rows to the window.
+    """
+
+    def __init__(self, cells, window=10):
+
+        self.window = window
+
+        keys = self.normalize(cells)
+        self.__order = numpy.argsort(keys, kind='stable')
+        self.__sorted_keys = keys[self.__order]
+
+    @staticmethod
+    def normalize(cells):
+        keys = pandas.Series(cells, dtype='string').fillna('').str.casefold().str.replace('[^a-z]', '', regex=True)
+        return keys.to_numpy(dtype=str)
+
+    def query(self, key):
+        first = numpy.searchsorted(self.__sorted_keys, key, side='left')
+        last = numpy.searchsorted(self.__sorted_keys, key, side='right')
+        return numpy.sort(self.__order[max(0, first - self.window):last + self.window])